@@ -17,7 +17,15 @@ class Settings:
     http_state_path: str = os.getenv("HTTP_STATE_PATH", "./data/http_state.json")
     http_cache_path: str = os.getenv("HTTP_CACHE_PATH", "./data/http_cache")
     http_cache_expire: int = int(os.getenv("HTTP_CACHE_EXPIRE_SECONDS", str(3 * 3600)))
+    http_cache_backend: str = os.getenv("HTTP_CACHE_BACKEND", "sqlite")
+    http_cache_wal: bool = os.getenv("HTTP_CACHE_WAL", "true").lower() in ("1", "true", "yes")
+    http_cache_busy_timeout_ms: int = int(os.getenv("HTTP_CACHE_BUSY_TIMEOUT_MS", "30000"))
+    http_pool_connections: int = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    http_pool_maxsize: int = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+    http_pool_block: bool = os.getenv("HTTP_POOL_BLOCK", "false").lower() in ("1", "true", "yes")
     retry_after_max_attempts: int = int(os.getenv("RETRY_AFTER_MAX_ATTEMPTS", "3"))
     retry_after_floor: float = float(os.getenv("RETRY_AFTER_FLOOR", "1"))
+    pipeline_state_path: str = os.getenv("PIPELINE_STATE_PATH", "./data/pipeline_state.json")
+    pipeline_workers: int = int(os.getenv("PIPELINE_WORKERS", "4"))
 
 settings = Settings()
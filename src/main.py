@@ -2,10 +2,10 @@ from __future__ import annotations
 from pathlib import Path
 import argparse
 import os
+import sys
 
-from .scraper.mse_scraper import scrape_all_companies, scrape_company_financials, LISTINGS_URL
-from .excel_writer.manifest import write_financials_manifest
-from .sql_writer.pg_writer import FileMeta, upsert_file_meta
+from .pipeline.runner import Pipeline, PipelineError
+from .pipeline.stages import build_stages, discover_company_files
 from .config import settings
 
 
@@ -13,21 +13,51 @@ def main():
     parser = argparse.ArgumentParser(description="MSE Financials Scraper")
     parser.add_argument("--all", action="store_true", help="Scrape all companies from listings page")
     parser.add_argument("--company", action="append", help="Specific company name to scrape (can pass multiple)")
-    parser.add_argument("--listings-url", default=LISTINGS_URL, help="Override listings URL")
+    parser.add_argument("--listings-url", default=None, help="Override listings URL")
     parser.add_argument("--manifest", default="./data/financials_manifest.xlsx", help="Path to write manifest excel")
     parser.add_argument("--write-db", action="store_true", help="Write file metadata to Postgres if DSN provided")
     parser.add_argument("--demo", action="store_true", help="Run a single-company demo (AIRTEL if available)")
+    parser.add_argument("--skip-scrape", action="store_true", help="Run pipeline stages over PDFs already on disk")
+    parser.add_argument("--dry-run", action="store_true", help="Explain which stages would run and why, without scraping or writing")
+    parser.add_argument("--force", action="store_true", help="Re-run every pipeline stage regardless of fingerprints")
+    parser.add_argument("--jobs", type=int, default=settings.pipeline_workers, help="Parallel workers for independent stages")
+    parser.add_argument("--export-state", metavar="PATH", help="Pack validators, HTML cache, request cache and PDFs into a bundle")
+    parser.add_argument("--import-state", metavar="PATH", help="Verify a state bundle and merge it into local state")
+    parser.add_argument(
+        "--since",
+        help="With --export-state, only include validators, HTML and PDFs changed since this ISO date/time "
+        "(unexpired request-cache rows are always included)",
+    )
     args = parser.parse_args()
 
+    if args.since and not args.export_state:
+        parser.error("--since can only be used with --export-state")
+
+    if args.export_state or args.import_state:
+        from .utils.state_bundle import export_state, import_state, parse_since
+        since = None
+        if args.since:
+            try:
+                since = parse_since(args.since)
+            except ValueError:
+                parser.error(f"--since must be an ISO date/time, got {args.since!r}")
+        if args.import_state:
+            import_state(Path(args.import_state))
+        if args.export_state:
+            export_state(Path(args.export_state), since)
+        return
+
     results: dict[str, list[Path]] = {}
 
-    if args.demo:
+    if args.skip_scrape or args.dry_run:
+        results = discover_company_files()
+    elif args.demo:
         # Single-company demo: prefer AIRTEL, else first
-        from .scraper.mse_scraper import parse_companies_from_listings, scrape_company_financials
+        # (the scraper loads robots.txt on import, so only import it when scraping)
+        from .scraper.mse_scraper import LISTINGS_URL, parse_companies_from_listings, scrape_company_financials
         try:
-            import sys
             from .utils.http import http_get
-            resp = http_get(args.listings_url)
+            resp = http_get(args.listings_url or LISTINGS_URL)
             companies = parse_companies_from_listings(resp.text)
             if not companies:
                 print("No companies discovered on listings page; cannot run demo.")
@@ -47,38 +77,38 @@ def main():
             print(f"Demo failed: {e}")
             return
     elif args.all:
-        results = scrape_all_companies(args.listings_url)
+        from .scraper.mse_scraper import LISTINGS_URL, scrape_all_companies
+        results = scrape_all_companies(args.listings_url or LISTINGS_URL)
     elif args.company:
+        from .scraper.mse_scraper import LISTINGS_URL, scrape_all_companies
         # Note: For company-specific scraping we need the mapping name->url. Here we re-scrape listings and filter.
-        all_results = scrape_all_companies(args.listings_url)
+        all_results = scrape_all_companies(args.listings_url or LISTINGS_URL)
         for name in args.company:
             if name in all_results:
                 results[name] = all_results[name]
             else:
                 print(f"Company '{name}' not found on listings page; skipping.")
     else:
-        print("No action specified. Use --all or --company NAME")
+        print("No action specified. Use --all, --company NAME or --skip-scrape")
         return
 
-    # Build manifest records
-    records = []
-    filemetas = []
-    for company, paths in results.items():
-        for p in paths:
-            records.append({
-                "company": company,
-                "file": p.name,
-                "path": str(p),
-            })
-            filemetas.append(FileMeta(company=company, label=p.stem, url="", path=str(p)))
-
-    if records:
-        out = Path(args.manifest)
-        write_financials_manifest(records, out)
-        print(f"Manifest written: {out}")
+    if not any(results.values()):
+        print("No financial files to process.")
+        return
 
-    if args.write_db and filemetas:
-        upsert_file_meta(os.getenv("POSTGRES_DSN", ""), filemetas)
+    # Only stages downstream of changed PDFs are re-run
+    stages = build_stages(
+        results,
+        Path(args.manifest),
+        write_db=args.write_db,
+        dsn=os.getenv("POSTGRES_DSN", ""),
+    )
+    pipeline = Pipeline(stages, keys=list(results))
+    try:
+        pipeline.run(dry_run=args.dry_run, force=args.force, workers=args.jobs)
+    except PipelineError as e:
+        print(f"Pipeline failed: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from ..config import settings
+
+# Partition key used by stages that run once over every company.
+GLOBAL = ""
+
+
+def _no_paths(key: str) -> list[Path]:
+    return []
+
+
+@dataclass
+class Stage:
+    """
+    A named pipeline step.
+
+    Partitioned stages run once per key (company) and only see that key's
+    inputs, so a new PDF for one company re-runs that company alone.
+    Unpartitioned stages run once over all keys. Bump `version` when the
+    stage's code changes in a way that should invalidate previous results;
+    `params` holds other settings the results depend on (e.g. a hash of the
+    target DSN) so changing them re-runs the stage too.
+    """
+    name: str
+    run: Callable[[str], None]
+    inputs: Callable[[str], list[Path]] = _no_paths
+    outputs: Callable[[str], list[Path]] = _no_paths
+    deps: tuple[str, ...] = ()
+    partitioned: bool = True
+    version: str = "1"
+    params: Dict[str, str] = field(default_factory=dict)
+
+
+class PipelineError(RuntimeError):
+    """Raised after a run in which some tasks failed or were skipped because of it."""
+
+    def __init__(self, failed: list[str]) -> None:
+        super().__init__(f"{len(failed)} pipeline task(s) failed: {', '.join(failed)}")
+        self.failed = failed
+
+
+def _task_id(stage: Stage, key: str) -> str:
+    return f"{stage.name}[{key}]" if stage.partitioned else stage.name
+
+
+@dataclass
+class Task:
+    stage: Stage
+    key: str
+    fingerprint: str
+    files: Dict[str, str]
+    upstream: Dict[str, str]
+    reasons: list[str] = field(default_factory=list)
+
+    @property
+    def id(self) -> str:
+        return _task_id(self.stage, self.key)
+
+
+class Pipeline:
+    """
+    Runs a DAG of stages, skipping tasks whose inputs are unchanged.
+
+    Inputs are fingerprinted by content hash (memoised on size and mtime so
+    unchanged PDFs are not re-read). A task's fingerprint also covers the
+    fingerprints of the upstream tasks it depends on, so any change flows to
+    everything downstream. Tasks share one thread pool and each starts as
+    soon as its own upstream tasks have finished, so a slow company does not
+    hold up downstream work for the others. A task is planned (its inputs
+    hashed) only once its upstream tasks are done, so it sees their outputs.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        keys: list[str],
+        state_path: str | Path | None = None,
+    ) -> None:
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("duplicate stage names in pipeline")
+        for s in stages:
+            for dep in s.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"stage '{s.name}' depends on unknown stage '{dep}'")
+        self.keys = list(keys)
+        self.levels = self._levels(stages)
+        self.state_path = Path(state_path or settings.pipeline_state_path).resolve()
+        self.state = self._load_state()
+
+    @staticmethod
+    def _levels(stages: list[Stage]) -> list[list[Stage]]:
+        remaining = {s.name: s for s in stages}
+        done: set[str] = set()
+        levels: list[list[Stage]] = []
+        while remaining:
+            ready = [s for s in remaining.values() if all(d in done for d in s.deps)]
+            if not ready:
+                raise ValueError(f"pipeline has a dependency cycle among: {sorted(remaining)}")
+            levels.append(ready)
+            for s in ready:
+                done.add(s.name)
+                del remaining[s.name]
+        return levels
+
+    def _load_state(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = {}
+        if self.state_path.exists():
+            try:
+                with self.state_path.open("r", encoding="utf-8") as handle:
+                    state = json.load(handle)
+            except Exception:
+                state = {}
+        state.setdefault("tasks", {})
+        state.setdefault("digests", {})
+        return state
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            json.dump(self.state, handle, indent=2, sort_keys=True)
+        # atomic swap so a crash mid-write cannot reset every fingerprint
+        tmp.replace(self.state_path)
+
+    def _digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        memo = self.state["digests"].get(key)
+        if memo and memo.get("size") == stat.st_size and memo.get("mtime_ns") == stat.st_mtime_ns:
+            return memo["sha256"]
+        h = hashlib.sha256()
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.state["digests"][key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }
+        return digest
+
+    def _upstream_ids(self, stage: Stage, key: str) -> list[str]:
+        ids: list[str] = []
+        for dep_name in stage.deps:
+            dep = self.stages[dep_name]
+            if not dep.partitioned:
+                ids.append(_task_id(dep, GLOBAL))
+            elif stage.partitioned:
+                ids.append(_task_id(dep, key))
+            else:
+                ids.extend(_task_id(dep, k) for k in self.keys)
+        return ids
+
+    def _plan_task(self, stage: Stage, key: str, planned: Dict[str, str], force: bool) -> Task:
+        files = {
+            str(p): self._digest(p)
+            for p in sorted(stage.inputs(key))
+            if p.is_file()
+        }
+        upstream = {uid: planned.get(uid, "") for uid in self._upstream_ids(stage, key)}
+        payload = json.dumps(
+            {"version": stage.version, "params": stage.params, "files": files, "upstream": upstream},
+            sort_keys=True,
+        )
+        fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        task = Task(stage, key, fingerprint, files, upstream)
+        task.reasons = self._reasons(task, force)
+        return task
+
+    def _reasons(self, task: Task, force: bool) -> list[str]:
+        if force:
+            return ["forced"]
+        previous = self.state["tasks"].get(task.id)
+        if previous is None:
+            return ["no previous run"]
+        reasons: list[str] = []
+        missing = [str(p) for p in task.stage.outputs(task.key) if not p.exists()]
+        if missing:
+            reasons.append("outputs missing: " + ", ".join(missing))
+        if previous.get("fingerprint") == task.fingerprint:
+            return reasons
+        if previous.get("version") != task.stage.version:
+            reasons.append(f"stage version {previous.get('version')} -> {task.stage.version}")
+        if previous.get("params", {}) != task.stage.params:
+            changed_params = sorted(
+                k for k in set(task.stage.params) | set(previous.get("params", {}))
+                if previous.get("params", {}).get(k) != task.stage.params.get(k)
+            )
+            reasons.append("stage params changed: " + ", ".join(changed_params))
+        old_files: Dict[str, str] = previous.get("files", {})
+        added = sorted(set(task.files) - set(old_files))
+        removed = sorted(set(old_files) - set(task.files))
+        changed = sorted(p for p in task.files if p in old_files and old_files[p] != task.files[p])
+        if added:
+            reasons.append("new inputs: " + ", ".join(added))
+        if changed:
+            reasons.append("changed inputs: " + ", ".join(changed))
+        if removed:
+            reasons.append("removed inputs: " + ", ".join(removed))
+        old_upstream: Dict[str, str] = previous.get("upstream", {})
+        for uid, fp in task.upstream.items():
+            if old_upstream.get(uid) != fp:
+                reasons.append(f"upstream {uid} changed")
+        return reasons or ["fingerprint changed"]
+
+    def _record(self, task: Task) -> None:
+        self.state["tasks"][task.id] = {
+            "fingerprint": task.fingerprint,
+            "version": task.stage.version,
+            "params": task.stage.params,
+            "files": task.files,
+            "upstream": task.upstream,
+        }
+
+    def run(
+        self,
+        *,
+        dry_run: bool = False,
+        force: bool = False,
+        workers: Optional[int] = None,
+    ) -> list[Task]:
+        """
+        Execute out-of-date tasks and return those that ran (or would run,
+        when `dry_run` is set). Tasks downstream of a failed task are skipped
+        and left out of date for the next run; once everything that can run
+        has finished, PipelineError is raised listing the failed tasks.
+        """
+        planned: Dict[str, str] = {}
+        failed: set[str] = set()
+        resolved: set[str] = set()
+        executed: list[Task] = []
+        workers = workers or settings.pipeline_workers
+        # topological order, so one pass can resolve a whole chain in dry-run
+        waiting = [
+            (stage, key)
+            for level in self.levels
+            for stage in level
+            for key in (self.keys if stage.partitioned else [GLOBAL])
+        ]
+        running: Dict[Future, Task] = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while waiting or running:
+                blocked_on_upstream = []
+                for stage, key in waiting:
+                    if not all(uid in resolved for uid in self._upstream_ids(stage, key)):
+                        blocked_on_upstream.append((stage, key))
+                        continue
+                    task = self._plan_task(stage, key, planned, force)
+                    planned[task.id] = task.fingerprint
+                    upstream_failed = [uid for uid in task.upstream if uid in failed]
+                    if upstream_failed:
+                        print(f"  skip {task.id}: upstream failed ({', '.join(upstream_failed)})")
+                        failed.add(task.id)
+                        resolved.add(task.id)
+                    elif task.reasons:
+                        print(f"  {'would run' if dry_run else 'run'} {task.id}: {'; '.join(task.reasons)}")
+                        if dry_run:
+                            executed.append(task)
+                            resolved.add(task.id)
+                        else:
+                            running[pool.submit(task.stage.run, task.key)] = task
+                    else:
+                        print(f"  up to date: {task.id}")
+                        resolved.add(task.id)
+                waiting = blocked_on_upstream
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"  stage {task.id} failed: {e}")
+                        failed.add(task.id)
+                    else:
+                        self._record(task)
+                        executed.append(task)
+                    resolved.add(task.id)
+                self._save_state()
+
+        if failed:
+            raise PipelineError(sorted(failed))
+        return executed
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ..excel_writer.manifest import write_financials_manifest
+from ..utils.paths import FINANCIALS_BASE, financials_relpath
+from ..utils.sources import load_sources, sources_path
+from .runner import Stage
+
+
+def discover_company_files() -> dict[str, list[Path]]:
+    """
+    Map each company directory under the financials base to the files it holds.
+    """
+    results: dict[str, list[Path]] = {}
+    if not FINANCIALS_BASE.exists():
+        return results
+    for d in sorted(FINANCIALS_BASE.iterdir()):
+        if d.is_dir():
+            results[d.name] = sorted(
+                p for p in d.iterdir() if p.is_file() and not p.name.startswith(".")
+            )
+    return results
+
+
+def build_stages(
+    files: dict[str, list[Path]],
+    manifest_path: Path,
+    *,
+    write_db: bool = False,
+    dsn: str = "",
+) -> list[Stage]:
+    """
+    Declare the post-scrape stages over the PDFs in `files` (company -> paths).
+
+    Extraction, ratio and sentiment stages should be added here as partitioned
+    stages that declare the company's PDFs (or upstream outputs) as inputs.
+    """
+    def company_inputs(company: str) -> list[Path]:
+        return list(files.get(company, []))
+
+    def all_inputs(_: str) -> list[Path]:
+        return [p for paths in files.values() for p in paths]
+
+    def write_manifest(_: str) -> None:
+        records = [
+            {"company": company, "file": p.name, "path": str(p)}
+            for company, paths in files.items()
+            for p in paths
+        ]
+        if not records:
+            print("No files to write to manifest.")
+            return
+        write_financials_manifest(records, manifest_path)
+        print(f"Manifest written: {manifest_path}")
+
+    stages = [
+        Stage(
+            name="manifest",
+            run=write_manifest,
+            inputs=all_inputs,
+            outputs=lambda _: [manifest_path],
+            partitioned=False,
+        ),
+    ]
+
+    if write_db:
+        from ..sql_writer.pg_writer import (
+            UNKNOWN_PERIOD,
+            FileMeta,
+            period_from_label,
+            refresh_latest_views,
+            upsert_file_meta,
+        )
+
+        # A different (or newly set) database must not look "up to date"
+        db_params = {"dsn": hashlib.sha256(dsn.encode("utf-8")).hexdigest()}
+
+        def require_dsn() -> None:
+            if not dsn:
+                raise RuntimeError("--write-db needs POSTGRES_DSN to be set")
+
+        def db_inputs(company: str) -> list[Path]:
+            paths = company_inputs(company)
+            # source labels decide the reporting period, so track them too
+            return paths + sorted({sources_path(p.parent) for p in paths})
+
+        def file_meta(company: str, p: Path) -> FileMeta:
+            source = load_sources(p.parent).get(p.name, {})
+            label = source.get("label", "")
+            period = period_from_label(label)
+            return FileMeta(
+                company=company,
+                label=label or p.stem,
+                url=source.get("url") or None,
+                path=financials_relpath(p),
+                fetched_at=datetime.fromtimestamp(p.stat().st_mtime, tz=timezone.utc),
+                period_year=UNKNOWN_PERIOD if period is None else period,
+            )
+
+        def upsert_company(company: str) -> None:
+            require_dsn()
+            metas = [file_meta(company, p) for p in files.get(company, [])]
+            if metas:
+                upsert_file_meta(dsn, metas, refresh=False)
+
+        def refresh_views(_: str) -> None:
+            require_dsn()
+            refresh_latest_views(dsn)
+
+        stages.append(Stage(name="db", run=upsert_company, inputs=db_inputs, params=db_params))
+        # Refresh the latest-* views once per ingest rather than per company
+        stages.append(
+            Stage(
+                name="db_views",
+                run=refresh_views,
+                deps=("db",),
+                partitioned=False,
+                params=db_params,
+            )
+        )
+
+    return stages
@@ -14,10 +14,11 @@ from urllib.robotparser import RobotFileParser
 from ..config import settings
 from ..utils.http import http_get
 from ..utils.http_state import update_metadata
-from ..utils.paths import company_financials_dir, ensure_dir
+from ..utils.paths import HTML_CACHE_BASE, company_financials_dir, ensure_dir
+from ..utils.sources import record_source
 
 LISTINGS_URL = urljoin(settings.base_url, "market/mainboard")
-HTML_CACHE_DIR = ensure_dir(Path(settings.data_dir) / "html-cache")
+HTML_CACHE_DIR = ensure_dir(HTML_CACHE_BASE)
 
 
 def _load_robot_rules() -> tuple[Optional[RobotFileParser], Optional[float]]:
@@ -286,6 +287,7 @@ def scrape_company_financials(name: str, url: str) -> list[Path]:
         path = download_pdf(pdf_url, out_dir, label)
         if path:
             print(f"  saved: {path}")
+            record_source(path, pdf_url, label)
             saved.append(path)
     return saved
 
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import time
+
+import psycopg
+from dotenv import load_dotenv
+
+from .pg_writer import _refresh_latest_views, ensure_schema, ensure_year_partitions
+
+BENCH_SCHEMA = "mse_bench"
+METRICS = ("pe_ratio", "roe", "debt_to_equity", "dividend_yield", "sentiment")
+
+# Baseline mirrors the original flat layout: url primary key, nothing else indexed.
+FLAT_DDL = """
+CREATE TABLE flat_filings (
+    company TEXT,
+    label TEXT,
+    url TEXT PRIMARY KEY,
+    path TEXT,
+    period_year INT,
+    fetched_at TIMESTAMPTZ
+);
+"""
+
+SEED_FILINGS = """
+INSERT INTO financial_filings (company, label, url, path, period_year, fetched_at)
+SELECT
+    'CO' || lpad(c::text, 3, '0'),
+    'Report ' || y || '-' || n,
+    'https://bench.local/' || c || '/' || y || '/' || n || '.pdf',
+    '/bench/' || c || '/' || y || '/' || n || '.pdf',
+    y,
+    make_timestamptz(y, 1, 1, 0, 0, 0, 'UTC') + random() * interval '364 days'
+FROM generate_series(1, %(companies)s::int) AS c,
+     generate_series(%(first)s::int, %(last)s::int) AS y,
+     generate_series(1, %(per_year)s::int) AS n;
+"""
+
+SEED_METRICS = """
+INSERT INTO derived_metrics (company, metric, period_year, value, computed_at)
+SELECT
+    'CO' || lpad(c::text, 3, '0'),
+    m,
+    y,
+    random() * 100,
+    make_timestamptz(y, 12, 31, 0, 0, 0, 'UTC')
+FROM generate_series(1, %(companies)s::int) AS c,
+     generate_series(%(first)s::int, %(last)s::int) AS y,
+     unnest(%(metrics)s::text[]) AS m;
+"""
+
+
+def _queries(year: int, since_year: int) -> list[tuple[str, str]]:
+    return [
+        (
+            "latest filing per company (flat)",
+            "SELECT DISTINCT ON (company) * FROM flat_filings ORDER BY company, period_year DESC, fetched_at DESC",
+        ),
+        (
+            "latest filing per company (partitioned)",
+            "SELECT DISTINCT ON (company) * FROM financial_filings ORDER BY company, period_year DESC, fetched_at DESC",
+        ),
+        ("latest filing per company (view)", "SELECT * FROM latest_filings"),
+        (f"filings in {year} (flat)", f"SELECT count(*) FROM flat_filings WHERE period_year = {year}"),
+        (f"filings in {year} (partitioned)", f"SELECT count(*) FROM financial_filings WHERE period_year = {year}"),
+        (
+            f"one company since {since_year} (flat)",
+            f"SELECT * FROM flat_filings WHERE company = 'CO001' "
+            f"AND fetched_at >= make_timestamptz({since_year}, 1, 1, 0, 0, 0, 'UTC') ORDER BY fetched_at DESC",
+        ),
+        (
+            f"one company since {since_year} (partitioned)",
+            f"SELECT * FROM financial_filings WHERE company = 'CO001' "
+            f"AND fetched_at >= make_timestamptz({since_year}, 1, 1, 0, 0, 0, 'UTC') ORDER BY fetched_at DESC",
+        ),
+        (
+            "latest metrics (table)",
+            "SELECT DISTINCT ON (company, metric) * FROM derived_metrics "
+            "ORDER BY company, metric, period_year DESC, computed_at DESC",
+        ),
+        ("latest metrics (view)", "SELECT * FROM latest_metrics"),
+    ]
+
+
+def _time_ms(cur: psycopg.Cursor, sql: str, repeat: int) -> tuple[float, float]:
+    samples: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def run_benchmark(
+    conn_str: str,
+    *,
+    years: int = 15,
+    companies: int = 40,
+    per_year: int = 250,
+    repeat: int = 20,
+    keep: bool = False,
+) -> None:
+    last = time.gmtime().tm_year
+    first = last - years + 1
+    params = {
+        "companies": companies,
+        "first": first,
+        "last": last,
+        "per_year": per_year,
+        "metrics": list(METRICS),
+    }
+    with psycopg.connect(conn_str) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+            cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+            cur.execute(f"SET search_path TO {BENCH_SCHEMA};")
+            ensure_schema(cur)
+            year_range = set(range(first, last + 1))
+            ensure_year_partitions(cur, "financial_filings", year_range)
+            ensure_year_partitions(cur, "derived_metrics", year_range)
+            cur.execute(FLAT_DDL)
+
+            print(f"Seeding {companies * years * per_year} filings across {years} years...")
+            start = time.perf_counter()
+            cur.execute(SEED_FILINGS, params)
+            cur.execute("INSERT INTO flat_filings SELECT * FROM financial_filings;")
+            cur.execute(SEED_METRICS, params)
+            conn.commit()
+            cur.execute("ANALYZE;")
+            print(f"  seeded in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            _refresh_latest_views(cur)
+            conn.commit()
+            print(f"  concurrent refresh of latest views: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+            print(f"\n{'query':<48} {'median ms':>10} {'max ms':>10}")
+            for label, sql in _queries(last - 1, last - 2):
+                median, worst = _time_ms(cur, sql, repeat)
+                print(f"{label:<48} {median:>10.2f} {worst:>10.2f}")
+
+            if not keep:
+                cur.execute(f"DROP SCHEMA {BENCH_SCHEMA} CASCADE;")
+        conn.commit()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark read queries on the Postgres read-side layout")
+    parser.add_argument("--dsn", default=os.getenv("POSTGRES_DSN", ""), help="Postgres DSN (defaults to POSTGRES_DSN)")
+    parser.add_argument("--years", type=int, default=15, help="Years of synthetic history to seed")
+    parser.add_argument("--companies", type=int, default=40, help="Number of synthetic companies")
+    parser.add_argument("--per-year", type=int, default=250, help="Filings per company per year")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the '{BENCH_SCHEMA}' schema afterwards")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        print("No POSTGRES_DSN provided; cannot run benchmark.")
+        return
+    run_benchmark(
+        args.dsn,
+        years=args.years,
+        companies=args.companies,
+        per_year=args.per_year,
+        repeat=args.repeat,
+        keep=args.keep,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,208 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from datetime import datetime, timezone
+import re
 import psycopg
 
+# Read-side layout: facts are range-partitioned by reporting year so
+# "all filings in 2024" only touches one partition, and the latest-per-company
+# questions analysts ask are served from materialised views that are
+# refreshed concurrently (readers are never blocked) after each ingest.
+SCHEMA_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS financial_filings (
+        company TEXT NOT NULL,
+        label TEXT,
+        url TEXT,
+        path TEXT NOT NULL,
+        period_year INT NOT NULL,
+        fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (path, period_year)
+    ) PARTITION BY RANGE (period_year);
+    """,
+    "CREATE TABLE IF NOT EXISTS financial_filings_default PARTITION OF financial_filings DEFAULT;",
+    "CREATE INDEX IF NOT EXISTS financial_filings_company_fetched_idx ON financial_filings (company, fetched_at DESC);",
+    "CREATE INDEX IF NOT EXISTS financial_filings_fetched_idx ON financial_filings (fetched_at);",
+    """
+    CREATE TABLE IF NOT EXISTS derived_metrics (
+        company TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        period_year INT NOT NULL,
+        value DOUBLE PRECISION,
+        computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (company, metric, period_year)
+    ) PARTITION BY RANGE (period_year);
+    """,
+    "CREATE TABLE IF NOT EXISTS derived_metrics_default PARTITION OF derived_metrics DEFAULT;",
+    "CREATE INDEX IF NOT EXISTS derived_metrics_company_computed_idx ON derived_metrics (company, metric, computed_at DESC);",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS latest_filings AS
+    SELECT DISTINCT ON (company) company, label, url, path, period_year, fetched_at
+    FROM financial_filings
+    ORDER BY company, period_year DESC, fetched_at DESC;
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS latest_filings_company_idx ON latest_filings (company);",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS latest_metrics AS
+    SELECT DISTINCT ON (company, metric) company, metric, period_year, value, computed_at
+    FROM derived_metrics
+    ORDER BY company, metric, period_year DESC, computed_at DESC;
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS latest_metrics_company_metric_idx ON latest_metrics (company, metric);",
+]
+
+# Filings whose reporting year is not known; kept in the default partition.
+UNKNOWN_PERIOD = 0
+
+# A year in listing/link text ("FY2024", "2023 Annual Report"), but not the
+# numeric id in a saved file name such as "Download_2045".
+_YEAR_RE = re.compile(r"(?<![\d_])(19[5-9]\d|20\d\d)(?!\d)")
+
+
+def period_from_label(label: str | None) -> int | None:
+    match = _YEAR_RE.search(label or "")
+    return int(match.group(1)) if match else None
+
+
 @dataclass
 class FileMeta:
     company: str
     label: str
-    url: str
+    url: str | None
     path: str
+    fetched_at: datetime | None = None
+    period_year: int | None = None
+
+    def resolved_period(self) -> int:
+        """
+        Reporting year: explicit value, else a year found in the label, else
+        UNKNOWN_PERIOD. Fetch time never decides the partition.
+        """
+        if self.period_year is not None:
+            return self.period_year
+        period = period_from_label(self.label)
+        return UNKNOWN_PERIOD if period is None else period
+
+
+@dataclass
+class MetricValue:
+    company: str
+    metric: str
+    period_year: int
+    value: float | None
+    computed_at: datetime | None = None
+
+
+def ensure_schema(cur: psycopg.Cursor) -> None:
+    # Serialise DDL between concurrent writers; released at commit.
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('mse_read_schema'));")
+    for ddl in SCHEMA_DDL:
+        cur.execute(ddl)
+
+
+def ensure_year_partitions(cur: psycopg.Cursor, table: str, years: set[int]) -> None:
+    """
+    Create one partition per reporting year before rows for it are inserted,
+    so nothing lands in the default partition (which would block creating
+    that year's partition later).
+    """
+    for year in sorted(years - {UNKNOWN_PERIOD}):
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_{year} PARTITION OF {table} "
+            f"FOR VALUES FROM ({year}) TO ({year + 1});"
+        )
+
+
+def _refresh_latest_views(cur: psycopg.Cursor) -> None:
+    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY latest_filings;")
+    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY latest_metrics;")
+
+
+def refresh_latest_views(conn_str: str):
+    if not conn_str:
+        print("No POSTGRES_DSN provided; skipping view refresh.")
+        return
+    with psycopg.connect(conn_str) as conn:
+        with conn.cursor() as cur:
+            ensure_schema(cur)
+        conn.commit()
+        with conn.cursor() as cur:
+            _refresh_latest_views(cur)
+        conn.commit()
 
 
-def upsert_file_meta(conn_str: str, items: list[FileMeta]):
+def upsert_file_meta(conn_str: str, items: list[FileMeta], refresh: bool = True):
     if not conn_str:
         print("No POSTGRES_DSN provided; skipping DB write.")
         return
     with psycopg.connect(conn_str) as conn:
         with conn.cursor() as cur:
-            cur.execute(
+            ensure_schema(cur)
+            rows = [
+                (
+                    it.company,
+                    it.label,
+                    it.url,
+                    it.path,
+                    it.resolved_period(),
+                    it.fetched_at or datetime.now(timezone.utc),
+                )
+                for it in items
+            ]
+            ensure_year_partitions(cur, "financial_filings", {r[4] for r in rows})
+            # a file whose period was corrected must not linger under the old one
+            cur.executemany(
+                "DELETE FROM financial_filings WHERE path = %s AND period_year <> %s;",
+                [(r[3], r[4]) for r in rows],
+            )
+            cur.executemany(
                 """
-                CREATE TABLE IF NOT EXISTS financial_files (
-                    company TEXT,
-                    label TEXT,
-                    url TEXT PRIMARY KEY,
-                    path TEXT
-                );
+                INSERT INTO financial_filings (company, label, url, path, period_year, fetched_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (path, period_year) DO UPDATE SET
+                    company = EXCLUDED.company,
+                    label = EXCLUDED.label,
+                    url = EXCLUDED.url,
+                    fetched_at = EXCLUDED.fetched_at;
+                """,
+                rows,
+            )
+        conn.commit()
+        if refresh:
+            with conn.cursor() as cur:
+                _refresh_latest_views(cur)
+            conn.commit()
+
+
+def upsert_metrics(conn_str: str, items: list[MetricValue], refresh: bool = True):
+    if not conn_str:
+        print("No POSTGRES_DSN provided; skipping DB write.")
+        return
+    with psycopg.connect(conn_str) as conn:
+        with conn.cursor() as cur:
+            ensure_schema(cur)
+            ensure_year_partitions(cur, "derived_metrics", {it.period_year for it in items})
+            cur.executemany(
                 """
+                INSERT INTO derived_metrics (company, metric, period_year, value, computed_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (company, metric, period_year) DO UPDATE SET
+                    value = EXCLUDED.value,
+                    computed_at = EXCLUDED.computed_at;
+                """,
+                [
+                    (
+                        it.company,
+                        it.metric,
+                        it.period_year,
+                        it.value,
+                        it.computed_at or datetime.now(timezone.utc),
+                    )
+                    for it in items
+                ],
             )
-            for it in items:
-                cur.execute(
-                    """
-                    INSERT INTO financial_files (company, label, url, path)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (url) DO UPDATE SET
-                        company = EXCLUDED.company,
-                        label = EXCLUDED.label,
-                        path = EXCLUDED.path;
-                    """,
-                    (it.company, it.label, it.url, it.path),
-                )
         conn.commit()
+        if refresh:
+            with conn.cursor() as cur:
+                _refresh_latest_views(cur)
+            conn.commit()
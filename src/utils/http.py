@@ -1,10 +1,10 @@
 from __future__ import annotations
 
+import threading
 import time
-from contextlib import contextmanager
 from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
-from typing import Optional, Dict, Any, cast
+from typing import Optional, Dict, Any
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -19,6 +19,7 @@ from ..config import settings
 from .http_state import prepare_conditional_headers, update_metadata
 
 _session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
 
 
 def _parse_retry_after(value: Optional[str]) -> Optional[float]:
@@ -41,50 +42,93 @@ def _parse_retry_after(value: Optional[str]) -> Optional[float]:
         return None
 
 
-@contextmanager
-def _maybe_disable_cache(session: requests.Session, cacheable: bool):
-    session_any = cast(Any, session)
-    if cacheable or not hasattr(session_any, "cache_disabled"):
-        yield
+def _bypass_cache(
+    session: requests.Session, cacheable: bool, headers: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    Keep this request out of the cache without touching session state
+    (CachedSession.cache_disabled() flips a session-wide flag and races with
+    other threads). With cache_control=True a response max-age overrides
+    expire_after, so the request also carries `Cache-Control: no-store`,
+    which requests_cache treats as skip-read and skip-write.
+    """
+    if cacheable or requests_cache is None or not isinstance(session, requests_cache.CachedSession):
+        return {}
+    headers["Cache-Control"] = "no-store"
+    return {"expire_after": requests_cache.DO_NOT_CACHE, "force_refresh": True}
+
+
+def _build_cache_backend() -> Any:
+    backend = settings.http_cache_backend.lower()
+    if backend == "sqlite":
+        # WAL lets readers proceed while a writer commits; busy_timeout makes
+        # writers wait for the lock instead of failing with "database is locked".
+        return requests_cache.SQLiteCache(
+            settings.http_cache_path,
+            wal=settings.http_cache_wal,
+            busy_timeout=settings.http_cache_busy_timeout_ms,
+        )
+    if backend == "filesystem":
+        # One file per response: writers never contend on a shared lock.
+        return requests_cache.FileCache(settings.http_cache_path)
+    return backend
+
+
+def _build_session() -> requests.Session:
+    if requests_cache is not None:
+        s = requests_cache.CachedSession(
+            cache_name=settings.http_cache_path,
+            backend=_build_cache_backend(),
+            expire_after=settings.http_cache_expire,
+            allowable_methods=("GET", "HEAD"),
+            cache_control=True,
+        )
     else:
-        with session_any.cache_disabled():
-            yield
+        s = requests.Session()
+
+    retries = Retry(
+        total=settings.retries,
+        backoff_factor=settings.backoff,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        raise_on_status=False,
+    )
+    # pool_connections = number of hosts kept pooled, pool_maxsize = sockets per host
+    adapter = HTTPAdapter(
+        max_retries=retries,
+        pool_connections=settings.http_pool_connections,
+        pool_maxsize=settings.http_pool_maxsize,
+        pool_block=settings.http_pool_block,
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update(
+        {
+            "User-Agent": settings.user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        }
+    )
+    return s
 
 
 def get_session() -> requests.Session:
     global _session
     if _session is None:
-        if requests_cache is not None:
-            s = requests_cache.CachedSession(
-                cache_name=settings.http_cache_path,
-                backend="sqlite",
-                expire_after=settings.http_cache_expire,
-                allowable_methods=("GET", "HEAD"),
-                cache_control=True,
-            )
-        else:
-            s = requests.Session()
-
-        retries = Retry(
-            total=settings.retries,
-            backoff_factor=settings.backoff,
-            status_forcelist=(500, 502, 503, 504),
-            allowed_methods=("GET", "HEAD"),
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        s.mount("http://", adapter)
-        s.mount("https://", adapter)
-        s.headers.update(
-            {
-                "User-Agent": settings.user_agent,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            }
-        )
-        _session = s
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
     return _session
 
 
+def reset_session() -> None:
+    """Close the shared session so the next call rebuilds it from settings."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
 def http_request(
     method: str,
     url: str,
@@ -104,16 +148,17 @@ def http_request(
     if conditional and method_upper in {"GET", "HEAD"}:
         request_headers.update(prepare_conditional_headers(url))
 
+    cache_kwargs = _bypass_cache(session, cacheable, request_headers)
     attempts = 0
     while True:
-        with _maybe_disable_cache(session, cacheable):
-            resp = session.request(
-                method_upper,
-                url,
-                timeout=timeout or settings.timeout,
-                headers=request_headers,
-                stream=stream,
-            )
+        resp = session.request(
+            method_upper,
+            url,
+            timeout=timeout or settings.timeout,
+            headers=request_headers,
+            stream=stream,
+            **cache_kwargs,
+        )
 
         if resp.status_code in {429, 503}:
             retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import json
+from datetime import datetime, timezone
 from pathlib import Path
 from threading import RLock
 from typing import Dict, Any
@@ -35,12 +36,22 @@ def _load_state() -> Dict[str, Dict[str, Any]]:
         return _STATE_CACHE
 
 
+def reload_state() -> None:
+    """Drop the in-memory state so the next access re-reads settings.http_state_path."""
+    global _STATE_CACHE
+    with _STATE_LOCK:
+        _STATE_CACHE = None
+
+
 def _save_state() -> None:
     state = _load_state()
     path = _state_path()
+    tmp = path.with_suffix(path.suffix + ".tmp")
     with _STATE_LOCK:
-        with path.open("w", encoding="utf-8") as handle:
+        with tmp.open("w", encoding="utf-8") as handle:
             json.dump(state, handle, indent=2, sort_keys=True)
+        # atomic swap so concurrent readers never see a half-written file
+        tmp.replace(path)
 
 
 def get_metadata(url: str) -> Dict[str, Any]:
@@ -65,16 +76,54 @@ def update_metadata(url: str, headers: Dict[str, Any]) -> None:
     last_modified = headers.get("Last-Modified")
     if not etag and not last_modified:
         return
-    state = _load_state()
-    state[url] = {
-        "etag": etag,
-        "last_modified": last_modified,
-    }
-    _save_state()
+    with _STATE_LOCK:
+        state = _load_state()
+        state[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        _save_state()
 
 
 def clear_metadata(url: str) -> None:
-    state = _load_state()
-    if url in state:
-        del state[url]
-    _save_state()
\ No newline at end of file
+    with _STATE_LOCK:
+        state = _load_state()
+        if url in state:
+            del state[url]
+        _save_state()
+
+
+def export_metadata(since: datetime | None = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Snapshot of stored validators. With `since`, only entries updated at or
+    after it; entries written before timestamps were recorded are full-export only.
+    """
+    with _STATE_LOCK:
+        state = _load_state()
+        if since is None:
+            return {url: dict(meta) for url, meta in state.items()}
+        cutoff = since.astimezone(timezone.utc).isoformat()
+        return {
+            url: dict(meta)
+            for url, meta in state.items()
+            if meta.get("updated_at", "") >= cutoff
+        }
+
+
+def merge_metadata(entries: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Merge validators from another node, keeping whichever entry per URL was
+    updated most recently. Returns the number of entries written.
+    """
+    written = 0
+    with _STATE_LOCK:
+        state = _load_state()
+        for url, meta in entries.items():
+            local = state.get(url)
+            if local is None or meta.get("updated_at", "") > local.get("updated_at", ""):
+                state[url] = dict(meta)
+                written += 1
+        if written:
+            _save_state()
+    return written
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict
+
+import requests
+
+from ..config import settings
+from . import http, http_state
+
+# Session settings before the concurrency work: urllib3's default pool of 10
+# sockets per host and the SQLite cache in rollback-journal mode.
+BASELINE = {"http_pool_connections": 10, "http_pool_maxsize": 10, "http_cache_wal": False}
+TUNED: Dict[str, Any] = {}
+_OVERRIDABLE = (
+    "http_cache_path",
+    "http_state_path",
+    "http_cache_backend",
+    "http_cache_wal",
+    "http_pool_connections",
+    "http_pool_maxsize",
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    body = b"x" * 2048
+    etag = '"v1"'
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf" if "/pdf/" in self.path else "text/html")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("Cache-Control", "max-age=3600")
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _fetch(url: str) -> None:
+    # mirrors the scraper: HTML pages are cached and conditional, PDFs are
+    # streamed past the cache (conditional), plus plain cached GETs
+    if "/pdf/" in url:
+        resp = http.http_get(url, stream=True, conditional=True, cacheable=False)
+        for _ in resp.iter_content(chunk_size=8192):
+            pass
+    elif "/page/" in url:
+        resp = http.http_get(url, conditional=True, cacheable=True)
+    else:
+        resp = http.http_get(url, conditional=False)
+    resp.close()
+
+
+def _urls(base_url: str, prefix: str, workers: int, per_worker: int, mixed: bool) -> list[str]:
+    kinds = ("plain", "pdf", "page") if mixed else ("plain",)
+    return [
+        f"{base_url}/{kinds[i % len(kinds)]}/{prefix}/{w}/{i}"
+        for w in range(workers)
+        for i in range(per_worker)
+    ]
+
+
+def _measure(urls: list[str], workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_fetch, urls))
+    return len(urls) / (time.perf_counter() - start)
+
+
+def _cache_violations(urls: list[str]) -> int:
+    """
+    Cacheable responses missing from the cache, or PDF responses that were
+    cached. Either means one request's cache choice leaked into another's.
+    """
+    session = http.get_session()
+    cache = getattr(session, "cache", None)
+    if cache is None:
+        return 0
+    # key prepared requests: cache.contains(url=...) keys an unprepared one
+    return sum(
+        1 for url in urls
+        if cache.contains(request=session.prepare_request(requests.Request("GET", url))) == ("/pdf/" in url)
+    )
+
+
+def run_stress(
+    worker_counts: tuple[int, ...] = (1, 8, 32),
+    requests_per_worker: int = 30,
+    rounds: int = 3,
+    backend: str | None = None,
+) -> dict[tuple[str, str, int], tuple[float, float, int]]:
+    """
+    Hammer a local HTTP server through the shared session and report the
+    median requests/second over `rounds` per worker count: a cold pass
+    (responses written to the cache) and a warm pass over the same URLs.
+    Runs the baseline and tuned session settings, each with plain cached
+    GETs and with a scraper-like mix of cached, conditional and uncached
+    requests, and counts responses whose caching went wrong.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    saved = {name: getattr(settings, name) for name in _OVERRIDABLE}
+    results: dict[tuple[str, str, int], tuple[float, float, int]] = {}
+    try:
+        for config_name, overrides in (("baseline", BASELINE), ("tuned", TUNED)):
+            for workload in ("cached", "mixed"):
+                with tempfile.TemporaryDirectory() as tmp:
+                    for name, value in saved.items():
+                        setattr(settings, name, value)
+                    for name, value in overrides.items():
+                        setattr(settings, name, value)
+                    if backend:
+                        settings.http_cache_backend = backend
+                    settings.http_cache_path = str(Path(tmp) / "http_cache")
+                    settings.http_state_path = str(Path(tmp) / "http_state.json")
+                    http_state.reload_state()
+                    http.reset_session()
+                    print(
+                        f"\n{config_name} / {workload}: backend={settings.http_cache_backend} "
+                        f"wal={settings.http_cache_wal} pool_maxsize={settings.http_pool_maxsize}"
+                    )
+                    print(f"{'workers':>8} {'cold req/s':>12} {'warm req/s':>12} {'cache errors':>13}")
+                    for workers in worker_counts:
+                        cold: list[float] = []
+                        warm: list[float] = []
+                        errors = 0
+                        for r in range(rounds):
+                            urls = _urls(base_url, f"w{workers}r{r}", workers, requests_per_worker, workload == "mixed")
+                            cold.append(_measure(urls, workers))
+                            errors += _cache_violations(urls)
+                            warm.append(_measure(urls, workers))
+                        row = (statistics.median(cold), statistics.median(warm), errors)
+                        results[(config_name, workload, workers)] = row
+                        print(f"{workers:>8} {row[0]:>12.1f} {row[1]:>12.1f} {row[2]:>13}")
+                    http.reset_session()
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+        http_state.reload_state()
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the shared HTTP session against a local server")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="Worker counts to measure")
+    parser.add_argument("--requests", type=int, default=30, help="Requests per worker per pass")
+    parser.add_argument("--rounds", type=int, default=3, help="Repeats per measurement; the median is reported")
+    parser.add_argument("--backend", default=None, help="Cache backend override (sqlite, filesystem, memory)")
+    args = parser.parse_args()
+    run_stress(tuple(args.workers), args.requests, args.rounds, args.backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from ..config import settings
 
 BASE = Path(settings.data_dir)
 FINANCIALS_BASE = Path(settings.financials_dir)
+HTML_CACHE_BASE = BASE / "html-cache"
 
 
 def ensure_dir(p: Path) -> Path:
@@ -11,6 +12,17 @@ def ensure_dir(p: Path) -> Path:
     return p
 
 
+def financials_relpath(p: Path) -> str:
+    """
+    `p` relative to the financials base ("AIRTEL/report.pdf"), so the same
+    filing gets the same key regardless of cwd or FINANCIALS_DIR.
+    """
+    try:
+        return p.resolve().relative_to(FINANCIALS_BASE.resolve()).as_posix()
+    except ValueError:
+        return f"{p.parent.name}/{p.name}"
+
+
 def company_financials_dir(company: str) -> Path:
     safe = "".join(ch for ch in company if ch.isalnum() or ch in ("-","_"," ")).strip()
     d = FINANCIALS_BASE / safe
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from threading import RLock
+from typing import Dict, Iterable
+
+# Per-company sidecar mapping each downloaded file name to the URL and
+# listing label it came from, which the file name alone does not carry.
+SOURCES_FILE = ".sources.json"
+
+_SOURCES_LOCK = RLock()
+
+
+def sources_path(directory: Path) -> Path:
+    return directory / SOURCES_FILE
+
+
+def load_sources(directory: Path) -> Dict[str, Dict[str, str]]:
+    path = sources_path(directory)
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except Exception:
+        return {}
+
+
+def _write_sources(directory: Path, sources: Dict[str, Dict[str, str]]) -> None:
+    path = sources_path(directory)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        json.dump(sources, handle, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def record_source(file_path: Path, url: str, label: str | None) -> None:
+    with _SOURCES_LOCK:
+        sources = load_sources(file_path.parent)
+        entry = {"url": url, "label": label or ""}
+        if sources.get(file_path.name) == entry:
+            return
+        sources[file_path.name] = entry
+        _write_sources(file_path.parent, sources)
+
+
+def merge_sources(
+    directory: Path,
+    entries: Dict[str, Dict[str, str]],
+    replaced: Iterable[str] = (),
+) -> int:
+    """
+    Merge sidecar entries from elsewhere into `directory` one file at a time.
+    Entries for files this directory has no record of are added; an existing
+    entry is only overwritten when its file is in `replaced` (the file itself
+    was just taken from the same source). Returns the number of entries written.
+    """
+    replaced = set(replaced)
+    with _SOURCES_LOCK:
+        sources = load_sources(directory)
+        changed = 0
+        for name, entry in entries.items():
+            if sources.get(name) == entry or (name in sources and name not in replaced):
+                continue
+            sources[name] = entry
+            changed += 1
+        if changed:
+            directory.mkdir(parents=True, exist_ok=True)
+            _write_sources(directory, sources)
+        return changed
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from .http_state import export_metadata, merge_metadata
+from .paths import FINANCIALS_BASE, HTML_CACHE_BASE, ensure_dir
+from .sources import load_sources, merge_sources, sources_path
+
+BUNDLE_VERSION = 1
+CACHE_TABLES = ("responses", "redirects")
+
+
+def parse_since(value: str) -> datetime:
+    """Parse an ISO date/time for delta bundles; naive values are taken as UTC."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _request_cache_path() -> Path:
+    # requests_cache appends .sqlite when the cache name has no suffix
+    path = Path(settings.http_cache_path)
+    return path if path.suffix else path.with_name(path.name + ".sqlite")
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _changed_since(path: Path, since: Optional[datetime]) -> bool:
+    return since is None or path.stat().st_mtime >= since.timestamp()
+
+
+def _is_download(path: Path) -> bool:
+    # skip the .sources.json sidecar and half-written *.tmp files
+    return path.is_file() and not path.name.startswith(".") and path.suffix != ".tmp"
+
+
+def _safe_relpath(value: str) -> PurePosixPath:
+    rel = PurePosixPath(value)
+    if rel.is_absolute() or ".." in rel.parts or not rel.parts:
+        raise ValueError(f"unsafe path in bundle: {value}")
+    return rel
+
+
+def _export_request_cache(dest: Path) -> int:
+    """
+    Copy unexpired request-cache rows into a standalone SQLite file. Expired
+    rows would only be refetched anyway, so they are left behind.
+    """
+    source = _request_cache_path()
+    if settings.http_cache_backend.lower() != "sqlite" or not source.exists():
+        return 0
+    now = int(time.time())
+    copied = 0
+    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(dest)) as out:
+        for table in CACHE_TABLES:
+            row = src.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            if row is None:
+                continue
+            out.execute(row[0])
+            rows = src.execute(
+                f"SELECT key, value, expires FROM {table} WHERE expires IS NULL OR expires > ?",
+                (now,),
+            ).fetchall()
+            out.executemany(f"INSERT INTO {table} (key, value, expires) VALUES (?, ?, ?)", rows)
+            copied += len(rows)
+        out.commit()
+    return copied
+
+
+def _merge_request_cache(source: Path) -> int:
+    """Upsert cached rows, keeping whichever copy of a key expires later."""
+    dest = _request_cache_path()
+    ensure_dir(dest.parent)
+    merged = 0
+    with closing(sqlite3.connect(dest, timeout=settings.http_cache_busy_timeout_ms / 1000)) as out:
+        out.execute("ATTACH DATABASE ? AS bundle", (str(source),))
+        for table in CACHE_TABLES:
+            row = out.execute(
+                "SELECT sql FROM bundle.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            if row is None:
+                continue
+            out.execute(row[0].replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+            before = out.total_changes
+            out.execute(
+                f"""
+                INSERT INTO main.{table} (key, value, expires)
+                SELECT key, value, expires FROM bundle.{table} WHERE true
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires
+                WHERE main.{table}.expires IS NOT NULL
+                  AND (excluded.expires IS NULL OR excluded.expires > main.{table}.expires)
+                """
+            )
+            merged += out.total_changes - before
+        out.commit()
+        out.execute("DETACH DATABASE bundle")
+    return merged
+
+
+def export_state(out_path: Path, since: Optional[datetime] = None) -> Path:
+    """
+    Pack crawl state into one gzipped tarball with a checksummed manifest:
+    HTTP validators, HTML snapshots, unexpired request-cache rows, PDFs
+    stored once per content hash and each company's source sidecar. With
+    `since`, only validators, HTML, PDFs and sidecars changed at or after that
+    time are included (a delta bundle); cache rows carry no write time, so
+    every unexpired row is always included.
+    """
+    members: Dict[str, Dict[str, Any]] = {}
+    html_mtimes: Dict[str, float] = {}
+    pdfs: Dict[str, Dict[str, Any]] = {}
+    source_dirs: list[str] = []
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_out = out_path.with_name(out_path.name + ".tmp")
+
+    with tempfile.TemporaryDirectory() as tmp, tarfile.open(tmp_out, "w:gz") as tar:
+
+        def add_file(arcname: str, path: Path) -> None:
+            members[arcname] = {"sha256": _sha256_file(path), "size": path.stat().st_size}
+            tar.add(path, arcname=arcname, recursive=False)
+
+        def add_bytes(arcname: str, data: bytes) -> None:
+            members[arcname] = {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+            info = tarfile.TarInfo(arcname)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+
+        validators = export_metadata(since)
+        add_bytes("http_state.json", json.dumps(validators, indent=2, sort_keys=True).encode("utf-8"))
+
+        if HTML_CACHE_BASE.exists():
+            for path in sorted(HTML_CACHE_BASE.glob("*.html")):
+                if _changed_since(path, since):
+                    add_file(f"html-cache/{path.name}", path)
+                    html_mtimes[path.name] = path.stat().st_mtime
+
+        if FINANCIALS_BASE.exists():
+            for company_dir in sorted(d for d in FINANCIALS_BASE.iterdir() if d.is_dir()):
+                for path in sorted(p for p in company_dir.iterdir() if _is_download(p)):
+                    if not _changed_since(path, since):
+                        continue
+                    digest = _sha256_file(path)
+                    rel = path.relative_to(FINANCIALS_BASE).as_posix()
+                    pdfs[rel] = {"sha256": digest, "mtime": path.stat().st_mtime}
+                    if f"blobs/{digest}" not in members:
+                        add_file(f"blobs/{digest}", path)
+                sidecar = sources_path(company_dir)
+                if sidecar.exists() and _changed_since(sidecar, since):
+                    entries = load_sources(company_dir)
+                    add_bytes(
+                        f"sources/{company_dir.name}.json",
+                        json.dumps(entries, indent=2, sort_keys=True).encode("utf-8"),
+                    )
+                    source_dirs.append(company_dir.name)
+
+        cache_db = Path(tmp) / "http_cache.sqlite"
+        cache_rows = _export_request_cache(cache_db)
+        if cache_rows:
+            add_file("http_cache.sqlite", cache_db)
+
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "since": since.isoformat() if since else None,
+            "members": members,
+            "html": html_mtimes,
+            "pdfs": pdfs,
+            "sources": source_dirs,
+        }
+        add_bytes("manifest.json", json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+    tmp_out.replace(out_path)
+    print(
+        f"State bundle written: {out_path} ({len(validators)} validators, {len(html_mtimes)} HTML pages, "
+        f"{len(pdfs)} PDFs, {len(source_dirs)} source sidecars, {cache_rows} cached responses)"
+    )
+    return out_path
+
+
+def import_state(bundle_path: Path) -> Dict[str, int]:
+    """
+    Verify every member against the bundle manifest, then merge into local
+    state without discarding anything newer that is already on this node.
+    """
+    # stage next to the data so final moves never cross filesystems
+    staging_parent = ensure_dir(Path(settings.data_dir))
+    with tempfile.TemporaryDirectory(dir=staging_parent) as tmp, tarfile.open(bundle_path, "r:gz") as tar:
+        staging = Path(tmp)
+        manifest_member = tar.extractfile("manifest.json")
+        if manifest_member is None:
+            raise ValueError(f"{bundle_path} has no manifest.json")
+        manifest = json.load(manifest_member)
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"unsupported bundle version: {manifest.get('version')}")
+        members: Dict[str, Dict[str, Any]] = manifest["members"]
+
+        # verify everything before touching local state
+        for info in tar:
+            if info.name == "manifest.json":
+                continue
+            expected = members.get(info.name)
+            if expected is None or not info.isfile():
+                raise ValueError(f"unexpected member in bundle: {info.name}")
+            target = staging / _safe_relpath(info.name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            handle = tar.extractfile(info)
+            assert handle is not None
+            h = hashlib.sha256()
+            with target.open("wb") as out:
+                for chunk in iter(lambda: handle.read(1 << 20), b""):
+                    h.update(chunk)
+                    out.write(chunk)
+            if h.hexdigest() != expected["sha256"]:
+                raise ValueError(f"checksum mismatch for {info.name}")
+        referenced = [f"html-cache/{name}" for name in manifest.get("html", {})]
+        referenced += [f"blobs/{meta['sha256']}" for meta in manifest.get("pdfs", {}).values()]
+        referenced += [f"sources/{name}.json" for name in manifest.get("sources", [])]
+        missing = [
+            name for name in [*members, *referenced]
+            if name not in members or not (staging / name).exists()
+        ]
+        if missing:
+            raise ValueError(f"bundle is missing members: {', '.join(missing)}")
+        for name in manifest.get("sources", []):
+            if len(_safe_relpath(name).parts) != 1:
+                raise ValueError(f"unexpected sources entry in bundle: {name}")
+
+        counts = {"validators": 0, "html": 0, "pdfs": 0, "sources": 0, "cache_rows": 0}
+
+        with (staging / "http_state.json").open("r", encoding="utf-8") as handle:
+            counts["validators"] = merge_metadata(json.load(handle))
+
+        html_dir = ensure_dir(HTML_CACHE_BASE)
+        for name, mtime in manifest.get("html", {}).items():
+            name = PurePosixPath(name).name
+            dest = html_dir / name
+            if dest.exists() and dest.stat().st_mtime >= mtime:
+                continue
+            shutil.move(staging / "html-cache" / name, dest)
+            os.utime(dest, (mtime, mtime))
+            counts["html"] += 1
+
+        replaced: Dict[str, set[str]] = {}
+        for rel, meta in manifest.get("pdfs", {}).items():
+            dest = FINANCIALS_BASE / _safe_relpath(rel)
+            if dest.exists() and (
+                dest.stat().st_mtime >= meta["mtime"] or _sha256_file(dest) == meta["sha256"]
+            ):
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp_dest = dest.with_name(dest.name + ".tmp")
+            with (staging / "blobs" / meta["sha256"]).open("rb") as src, tmp_dest.open("wb") as out:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    out.write(chunk)
+            tmp_dest.replace(dest)
+            os.utime(dest, (meta["mtime"], meta["mtime"]))
+            counts["pdfs"] += 1
+            replaced.setdefault(dest.parent.name, set()).add(dest.name)
+
+        # merge sidecars entry by entry so files only this node knows keep their
+        # source; a bundle entry wins only for a PDF that was just replaced
+        for name in manifest.get("sources", []):
+            company_dir = FINANCIALS_BASE / name
+            with (staging / "sources" / f"{name}.json").open("r", encoding="utf-8") as handle:
+                entries = json.load(handle)
+            counts["sources"] += merge_sources(company_dir, entries, replaced.get(company_dir.name, ()))
+
+        if (staging / "http_cache.sqlite").exists():
+            if settings.http_cache_backend.lower() == "sqlite":
+                counts["cache_rows"] = _merge_request_cache(staging / "http_cache.sqlite")
+            else:
+                print(f"  skipping request cache: backend is {settings.http_cache_backend}, not sqlite")
+
+    print(
+        f"State bundle imported: {bundle_path} ({counts['validators']} validators, {counts['html']} HTML pages, "
+        f"{counts['pdfs']} PDFs, {counts['sources']} source entries, {counts['cache_rows']} cached responses)"
+    )
+    return counts